@@ -10,7 +10,10 @@ from datetime import datetime, timedelta
 # --- Configuration & Constants ---
 DATA_FILE = "timer_history.json"
 CONFIG_FILE = "timer_config.json"
+CATALOG_FILE = "timer_catalog.json"
+CATALOG_HALF_LIFE_DAYS = 7  # use counts lose half their weight per week of disuse
 PRESETS = [5, 10, 15, 20, 25, 30, 45, 60, 90, 120]
+METRICS_INTERVAL = 15  # seconds between periodic textfile exports
 
 DEFAULT_CONFIG = {
     "project_tags": {},
@@ -54,6 +57,10 @@ SESSION = {
     'show_colon': True
 }
 
+EXPORTER = {'last_write': 0, 'stats_key': None, 'stats': ""}
+
+CATALOG = {'data': None, 'ranked': {}}
+
 # --- Data Management ---
 def load_history():
     if not os.path.exists(DATA_FILE): return []
@@ -75,25 +82,95 @@ def load_config():
 def save_config(cfg):
     with open(CONFIG_FILE, 'w') as f: json.dump(cfg, f, indent=2)
 
+# --- Project/Task Catalog ---
+# {"history_stamp": [mtime, size], "projects": {name: {"last_used": iso, "count": n, "tasks": {task: {...}}}}}
+def catalog_add(cat, session, delta=1):
+    p = session.get('project'); t = session.get('task'); ts = session.get('timestamp', '')
+    if not p: return
+    pe = cat['projects'].setdefault(p, {"last_used": "", "count": 0, "tasks": {}})
+    entries = [pe]
+    if t: entries.append(pe['tasks'].setdefault(t, {"last_used": "", "count": 0}))
+    for e in entries:
+        e['count'] += delta
+        if delta > 0 and ts > e['last_used']: e['last_used'] = ts
+    if t and pe['tasks'][t]['count'] <= 0: del pe['tasks'][t]
+    if pe['count'] <= 0: del cat['projects'][p]
+
+def build_catalog(history):
+    cat = {"projects": {}}
+    for i in history: catalog_add(cat, i)
+    return cat
+
+def history_stamp():
+    try: st = os.stat(DATA_FILE); return [st.st_mtime, st.st_size]
+    except OSError: return None
+
+def load_catalog():
+    cat = CATALOG['data']
+    if cat is None and os.path.exists(CATALOG_FILE):
+        try:
+            with open(CATALOG_FILE, 'r') as f: cat = json.load(f)
+        except: cat = None
+    if not isinstance(cat, dict) or 'projects' not in cat or cat.get('history_stamp') != history_stamp():
+        # First run, unreadable file, or history changed behind our back: rebuild from history
+        cat = build_catalog(load_history()); save_catalog(cat)
+    elif cat is not CATALOG['data']: CATALOG['data'] = cat; CATALOG['ranked'] = {}
+    return cat
+
+def save_catalog(cat):
+    cat['history_stamp'] = history_stamp(); CATALOG['data'] = cat; CATALOG['ranked'] = {}
+    try:
+        with open(CATALOG_FILE, 'w') as f: json.dump(cat, f, indent=2)
+    except OSError: pass
+
+def rank_entries(entries):
+    # MRU entry first, the rest by use count decayed by time since last use
+    now = datetime.now()
+    def score(e):
+        try: age = max(0, (now - datetime.fromisoformat(e['last_used'])).total_seconds() / 86400)
+        except: age = 365
+        return e['count'] * 0.5 ** (age / CATALOG_HALF_LIFE_DAYS)
+    names = sorted(entries, key=lambda n: (-score(entries[n]), n))
+    mru = max(entries, key=lambda n: entries[n]['last_used'], default=None)
+    if mru is not None: names.remove(mru); names.insert(0, mru)
+    return names
+
 def get_unique_projects():
-    history = load_history()
-    return sorted(list(set(i['project'] for i in history if i.get('project'))))
+    load_catalog()
+    if None not in CATALOG['ranked']: CATALOG['ranked'][None] = rank_entries(CATALOG['data']['projects'])
+    return CATALOG['ranked'][None][:]
 
 def get_unique_tasks(project_name):
-    history = load_history()
-    return sorted(list(set(i['task'] for i in history if i.get('project') == project_name and i.get('task'))))
+    cat = load_catalog()
+    if project_name not in cat['projects']: return []
+    if project_name not in CATALOG['ranked']: CATALOG['ranked'][project_name] = rank_entries(cat['projects'][project_name]['tasks'])
+    return CATALOG['ranked'][project_name][:]
 
 def save_session(session):
-    history = load_history()
+    cat = load_catalog(); history = load_history()
     history.insert(0, session)
-    history = history[:1000]
+    dropped = history[1000:]; history = history[:1000]
     with open(DATA_FILE, 'w') as f: json.dump(history, f, indent=2)
+    catalog_add(cat, session)
+    for i in dropped: catalog_add(cat, i, -1)
+    save_catalog(cat)
 
 def delete_session(index):
-    history = load_history()
+    cat = load_catalog(); history = load_history()
     if 0 <= index < len(history):
-        del history[index]
+        removed = history.pop(index)
         with open(DATA_FILE, 'w') as f: json.dump(history, f, indent=2)
+        catalog_add(cat, removed, -1)
+        # Roll last_used back to the newest remaining session for that project/task
+        pe = cat['projects'].get(removed.get('project'))
+        if pe:
+            lp = max((i.get('timestamp', '') for i in history if i.get('project') == removed['project']), default="")
+            pe['last_used'] = lp
+            te = pe['tasks'].get(removed.get('task'))
+            if te:
+                lt = max((i.get('timestamp', '') for i in history if i.get('project') == removed['project'] and i.get('task') == removed['task']), default="")
+                te['last_used'] = lt
+        save_catalog(cat)
         return True
     return False
 
@@ -134,8 +211,67 @@ def parse_time_str(s):
     except: pass
     return None
 
+# --- Metrics Export ---
+def get_metrics_path():
+    for a in sys.argv[1:]:
+        if a.startswith("--metrics-file="): return a.split("=", 1)[1]
+    return None
+
+def prom_label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def build_stats_metrics():
+    # Aggregates only change with the history file (or the date), so cache on both
+    try: st = os.stat(DATA_FILE); key = (st.st_mtime, st.st_size, datetime.now().date())
+    except OSError: key = (None, None, datetime.now().date())
+    if key == EXPORTER['stats_key']: return EXPORTER['stats']
+    history = load_history(); today = key[2]; wk_start = today - timedelta(days=today.weekday())
+    proj_today = {}; proj_week = {}; counts = {'completed': 0, 'aborted': 0}; days = set()
+    for i in history:
+        try:
+            d = datetime.fromisoformat(i['timestamp']).date(); days.add(d)
+            st_ = i.get('status', 'unknown'); counts[st_] = counts.get(st_, 0) + 1
+            dur = i['duration_minutes'] if st_ == 'completed' else (i.get('actual_duration_seconds',0)/60)
+            p = i.get('project', 'Unknown')
+            if d == today: proj_today[p] = proj_today.get(p, 0) + dur
+            if wk_start <= d < wk_start + timedelta(days=7): proj_week[p] = proj_week.get(p, 0) + dur
+        except: pass
+    streak = 0; check = today
+    while check in days: streak += 1; check -= timedelta(days=1)
+    out = ["# HELP timer_project_minutes Minutes logged per project.", "# TYPE timer_project_minutes gauge"]
+    for period, data in (("today", proj_today), ("week", proj_week)):
+        for p, m in sorted(data.items()): out.append(f'timer_project_minutes{{project="{prom_label(p)}",period="{period}"}} {m:.2f}')
+    out += ["# HELP timer_streak_days Consecutive days with at least one session.", "# TYPE timer_streak_days gauge", f"timer_streak_days {streak}"]
+    out += ["# HELP timer_sessions Sessions in history by status.", "# TYPE timer_sessions gauge"]
+    for st_, n in sorted(counts.items()): out.append(f'timer_sessions{{status="{prom_label(st_)}"}} {n}')
+    EXPORTER['stats_key'] = key; EXPORTER['stats'] = "\n".join(out)
+    return EXPORTER['stats']
+
+def export_metrics(force=False):
+    path = get_metrics_path(); now = time.time()
+    if not path or (not force and now - EXPORTER['last_write'] < METRICS_INTERVAL): return
+    EXPORTER['last_write'] = now
+    state = SESSION['state'] if SESSION['active'] else 'stopped'
+    elapsed = SESSION['elapsed_before_pause'] + (now - SESSION['start_time'] if state == 'running' else 0)
+    rem = max(0, SESSION['duration_secs'] - elapsed) if state in ('running', 'paused') else 0
+    out = ["# HELP timer_session_state Current timer state (1 for the active state).", "# TYPE timer_session_state gauge"]
+    for s in ['stopped', 'running', 'paused', 'finished']: out.append(f'timer_session_state{{state="{s}"}} {int(s == state)}')
+    out += ["# HELP timer_session_remaining_seconds Seconds left on the current session.", "# TYPE timer_session_remaining_seconds gauge", f"timer_session_remaining_seconds {rem:.0f}"]
+    out += ["# HELP timer_session_info Project and task of the current session.", "# TYPE timer_session_info gauge"]
+    if SESSION['active']: out.append(f'timer_session_info{{project="{prom_label(SESSION["project"])}",task="{prom_label(SESSION["task"])}"}} 1')
+    out.append(build_stats_metrics())
+    # Write beside the target and rename so node_exporter never reads a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w') as f: f.write("\n".join(out) + "\n")
+        os.replace(tmp, path)
+    except OSError:
+        try: os.remove(tmp)
+        except OSError: pass
+
 # --- Timer Logic ---
 def tick_timer():
+    export_metrics()
     if not SESSION['active'] or SESSION['state'] != 'running': return
     now = time.time()
     elapsed = SESSION['elapsed_before_pause'] + (now - SESSION['start_time'])
@@ -146,12 +282,14 @@ def tick_timer():
     if remaining <= 0:
         SESSION['state'] = 'finished'; SESSION['show_colon'] = True
         save_session({"project": SESSION['project'], "task": SESSION['task'], "duration_minutes": SESSION['duration_secs'] // 60, "timestamp": datetime.now().isoformat(), "status": "completed"})
+        export_metrics(force=True)
 
 def start_new_session(project, task, duration_mins):
     SESSION['active'] = True; SESSION['state'] = 'running'
     SESSION['project'] = project; SESSION['task'] = task
     SESSION['duration_secs'] = duration_mins * 60
     SESSION['start_time'] = time.time(); SESSION['elapsed_before_pause'] = 0; SESSION['show_colon'] = True
+    export_metrics(force=True)
 
 def abort_session():
     if not SESSION['active']: return
@@ -160,6 +298,7 @@ def abort_session():
     if SESSION['state'] != 'finished':
         save_session({"project": SESSION['project'], "task": SESSION['task'], "duration_minutes": SESSION['duration_secs'] // 60, "timestamp": datetime.now().isoformat(), "status": "aborted", "actual_duration_seconds": int(elapsed)})
     SESSION['active'] = False; SESSION['state'] = 'stopped'
+    export_metrics(force=True)
 
 # --- TUI Helpers ---
 def draw_box(stdscr, y, x, height, width, title=""):
@@ -404,7 +543,7 @@ def show_history(stdscr):
             conf_k = stdscr.getch()
             stdscr.timeout(50)
             if conf_k in [ord('y'), ord('Y')]:
-                delete_session(idx); history = load_history()
+                delete_session(idx); history = load_history(); export_metrics(force=True)
         elif k in [ord('q'), ord('Q')]: return 'QUIT'
         elif k == curses.KEY_UP: idx -= 1
         elif k == curses.KEY_DOWN: idx += 1
@@ -445,8 +584,8 @@ def show_timer_view(stdscr):
             if sel in ["BACK", "MENU"]: return 'HISTORY'
             elif sel == "QUIT": abort_session(); return 'QUIT'
             elif sel == "RESTART": abort_session(); start_new_session(SESSION['project'], SESSION['task'], SESSION['duration_secs']//60); return 'TIMER'
-            elif sel == "START": SESSION['state']='running'; SESSION['start_time']=time.time()
-            elif sel == "PAUSE": SESSION['state']='paused'; SESSION['elapsed_before_pause']+= (time.time()-SESSION['start_time'])
+            elif sel == "START": SESSION['state']='running'; SESSION['start_time']=time.time(); export_metrics(force=True)
+            elif sel == "PAUSE": SESSION['state']='paused'; SESSION['elapsed_before_pause']+= (time.time()-SESSION['start_time']); export_metrics(force=True)
         elif k == 27: return 'HISTORY'
 
 def show_yearly_heatmap(stdscr):
@@ -654,7 +793,7 @@ def calculate_stats():
 def main(stdscr):
     curses.start_color(); curses.use_default_colors()
     for i, c in enumerate([curses.COLOR_WHITE, curses.COLOR_CYAN, curses.COLOR_BLUE, curses.COLOR_GREEN, curses.COLOR_RED, curses.COLOR_YELLOW], 1): curses.init_pair(i, c, -1)
-    curses.curs_set(0); view = 'HISTORY'
+    curses.curs_set(0); view = 'HISTORY'; export_metrics(force=True)
     while True:
         if view == 'HISTORY': view = show_history(stdscr)
         elif view == 'TIMER': view = show_timer_view(stdscr)
@@ -678,4 +817,6 @@ def main(stdscr):
 
 if __name__ == "__main__":
     try: curses.wrapper(main)
-    except KeyboardInterrupt: print("\nExited.")
+    except KeyboardInterrupt:
+        SESSION['active'] = False; SESSION['state'] = 'stopped'; export_metrics(force=True)
+        print("\nExited.")